@@ -2,18 +2,235 @@
 Audio format conversion utilities.
 Handles μ-law ↔ PCM conversion and resampling.
 """
+import functools
+import logging
+from typing import Tuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from fast import b64decode, b64encode
 try:
-    import audioop  # Built-in for Python 3.12 and earlier
+    import numba  # Optional: fused JIT kernels for both conversion directions
 except ImportError:
-    import audioop_lts as audioop  # For Python 3.13+
-import base64
-import logging
+    numba = None
+try:
+    import soxr  # Optional: higher-quality stateless resample() helper
+except ImportError:
+    soxr = None
 
 logger = logging.getLogger(__name__)
 
 
+def _build_ulaw2lin() -> np.ndarray:
+    """G.711 μ-law decode table: 256 codes → int16 samples."""
+    u = ~np.arange(256, dtype=np.int32) & 0xFF
+    t = (((u & 0x0F) << 3) + 0x84) << ((u & 0x70) >> 4)
+    return np.where(u & 0x80, 0x84 - t, t - 0x84).astype(np.int16)
+
+
+def _build_lin2ulaw() -> np.ndarray:
+    """G.711 μ-law encode table: every int16 sample (by uint16 bit pattern) → code."""
+    pcm = np.arange(65536, dtype=np.uint16).view(np.int16).astype(np.int32) >> 2  # 14-bit
+    mask = np.where(pcm < 0, 0x7F, 0xFF)
+    magnitude = np.minimum(np.abs(pcm), 8159) + 33  # Clip, then add bias
+    segment = np.searchsorted(
+        np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF]), magnitude
+    )
+    code = np.where(
+        segment >= 8, 0x7F, (segment << 4) | ((magnitude >> (segment + 1)) & 0x0F)
+    )
+    return (code ^ mask).astype(np.uint8)
+
+
+# G.711 μ-law lookup tables, built once at import (bit-exact with audioop).
+_ULAW2LIN = _build_ulaw2lin()  # 256 x int16
+_LIN2ULAW = _build_lin2ulaw()  # 65536 x uint8 (64KB)
+
+_EMPTY_PCM = np.empty(0, dtype=np.int16)
+
+# MIME subtypes that already carry G.711 μ-law (Smartflo's wire codec)
+_ULAW_SUBTYPES = frozenset(("pcmu", "x-mulaw", "mulaw", "basic"))
+
+
+@functools.lru_cache(maxsize=16)
+def parse_audio_mime(mime_type: str) -> Tuple[bool, int]:
+    """
+    Parse an inline audio MIME type such as 'audio/pcm;rate=24000'.
+    
+    Returns:
+        (is_ulaw, sample_rate); without a rate parameter μ-law is taken as
+        8kHz and PCM as 24kHz (Gemini Live's output rate)
+    """
+    subtype, _, params = mime_type.partition(";")
+    is_ulaw = subtype.strip().lower().removeprefix("audio/") in _ULAW_SUBTYPES
+    rate = 8000 if is_ulaw else 24000
+    for param in params.split(";"):
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "rate" and value.strip().isdigit():
+            rate = int(value)
+    return is_ulaw, rate
+
+# 24kHz → 8kHz decimation filter: 48-tap Kaiser-windowed sinc low-pass
+# (same design as scipy.signal.firwin(48, 0.95/3, window=('kaiser', 8.6))).
+_DECIM_FACTOR = 3
+_DECIM_NUM_TAPS = 48
+_DECIM_CUTOFF = 0.95 / _DECIM_FACTOR
+
+
+def _lowpass_taps(cutoff: float, num_taps: int = _DECIM_NUM_TAPS) -> np.ndarray:
+    """Kaiser-windowed sinc low-pass (cutoff as a fraction of Nyquist), unity DC gain."""
+    taps = (
+        cutoff
+        * np.sinc(cutoff * (np.arange(num_taps) - (num_taps - 1) / 2))
+        * np.kaiser(num_taps, 8.6)
+    )
+    return (taps / taps.sum()).astype(np.float32)
+
+
+_DECIM_TAPS = _lowpass_taps(_DECIM_CUTOFF)
+
+
+class _StreamResampler:
+    """
+    Stateful any-rate → 8kHz resampler for PCM that isn't 24kHz.
+    
+    Carried-state anti-aliasing FIR (downsampling only), then linear
+    interpolation whose position and previous sample carry across chunks,
+    so chunk boundaries stay continuous (no clicks at frame edges).
+    """
+    
+    __slots__ = ('_taps', '_tail', '_step', '_pos', '_last')
+    
+    def __init__(self, from_rate: int):
+        self._step = from_rate / 8000
+        if from_rate > 8000:
+            self._taps = _lowpass_taps(0.95 * 8000 / from_rate)
+            self._tail = np.zeros(_DECIM_NUM_TAPS - 1, dtype=np.float32)
+        else:
+            self._taps = None
+            self._tail = None
+        self.reset()
+    
+    def reset(self):
+        """Drop carried state (call end)."""
+        if self._tail is not None:
+            self._tail[:] = 0
+        self._pos = 1.0   # Next output position; index 0 is the previous chunk's last sample
+        self._last = 0.0
+    
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Resample one chunk of int16 samples to 8kHz int16."""
+        x = samples.astype(np.float32)
+        if self._taps is not None:
+            buf = np.concatenate((self._tail, x))
+            self._tail = buf[-(_DECIM_NUM_TAPS - 1):].copy()
+            x = np.convolve(buf, self._taps, mode='valid')  # Symmetric taps; len(x) == len(samples)
+        
+        xp = np.concatenate(((self._last,), x))
+        end = len(xp) - 1
+        n_out = int((end - self._pos) // self._step) + 1 if self._pos <= end else 0
+        positions = self._pos + np.arange(n_out) * self._step
+        out = np.interp(positions, np.arange(len(xp)), xp)
+        
+        self._pos += n_out * self._step - end
+        self._last = float(xp[-1])
+        return np.clip(np.rint(out), -32768, 32767).astype(np.int16)
+
+if numba is not None:
+    @numba.njit(cache=True, nogil=True, boundscheck=False)
+    def _ulaw8k_to_pcm16k(ulaw, lut, last_sample, out):
+        """Fused μ-law decode + 2x linear upsample into out; returns the last sample."""
+        prev = last_sample
+        for i in range(ulaw.shape[0]):
+            sample = lut[ulaw[i]]
+            out[2 * i] = (prev + sample) >> 1
+            out[2 * i + 1] = sample
+            prev = sample
+        return prev
+    
+    # reassoc lets LLVM vectorize the tap dot product (a reordered float sum)
+    @numba.njit(cache=True, nogil=True, boundscheck=False, fastmath={'reassoc'})
+    def _pcm24k_to_ulaw8k(pcm, tail, phase, taps, lut, work, out):
+        """
+        Fused FIR decimate-by-3 + μ-law encode into out; returns samples written.
+        tail holds the previous len(taps)-1 inputs and is updated in place.
+        work (>= len(tail) + len(pcm) floats) receives tail + pcm contiguously,
+        so the tap loop is a branch-free dot product.
+        """
+        n = pcm.shape[0]
+        n_tail = tail.shape[0]
+        n_taps = taps.shape[0]
+        for i in range(n_tail):
+            work[i] = tail[i]
+        for i in range(n):
+            work[n_tail + i] = pcm[i]
+        
+        written = 0
+        for k in range(phase, n, 3):
+            acc = 0.0
+            for t in range(n_taps):
+                acc += work[k + t] * taps[t]
+            value = int(round(acc))
+            if value > 32767:
+                value = 32767
+            elif value < -32768:
+                value = -32768
+            out[written] = lut[value & 0xFFFF]
+            written += 1
+        
+        # Slide the FIR history: keep the newest n_tail inputs
+        for i in range(n_tail):
+            tail[i] = work[n + i]
+        return written
+    
+    # Compile at import (loaded from the on-disk cache after the first run)
+    # so no call pays the JIT cost. Inputs are read-only np.frombuffer(bytes)
+    # views, as in real calls: numba compiles those as a separate signature.
+    _ulaw8k_to_pcm16k(
+        np.frombuffer(bytes(1), np.uint8), _ULAW2LIN, 0, np.empty(2, np.int16)
+    )
+    _pcm24k_to_ulaw8k(
+        np.frombuffer(bytes(6), np.int16), np.zeros(_DECIM_NUM_TAPS - 1, np.float32), 0,
+        _DECIM_TAPS, _LIN2ULAW, np.empty(_DECIM_NUM_TAPS + 2, np.float32), np.empty(1, np.uint8)
+    )
+
+
 class AudioConverter:
-    """Fast audio conversion for streaming."""
+    """
+    Fast audio conversion for streaming.
+    
+    One instance per call: the Smartflo → Gemini upsampler keeps the last
+    input sample and the Gemini → Smartflo decimator keeps its FIR history,
+    so both directions stay continuous across chunk boundaries.
+    
+    With numba installed each direction runs as a single fused kernel
+    writing into a reusable per-instance buffer; otherwise NumPy is used
+    (bit-identical upsampling at exactly 2x the input length; the decimator's
+    vectorized float sum can round a rare sample one μ-law step differently).
+    """
+    
+    __slots__ = (
+        '_last_sample', '_down_tail', '_down_phase',
+        '_up_buf', '_down_buf', '_down_work', '_resamplers',
+    )
+    
+    def __init__(self):
+        self._last_sample = 0    # Last 8kHz sample of the previous inbound chunk
+        self._down_tail = np.zeros(_DECIM_NUM_TAPS - 1, dtype=np.float32)  # FIR history
+        self._down_phase = 0     # Offset of the next kept sample in the 24kHz stream
+        self._resamplers = {}    # Source rate → _StreamResampler, for non-24kHz Gemini audio
+        
+        # Reusable kernel output buffers (grown on demand)
+        self._up_buf = np.empty(0, dtype=np.int16)
+        self._down_buf = np.empty(0, dtype=np.uint8)
+        self._down_work = np.empty(0, dtype=np.float32)  # FIR history + chunk, contiguous
+    
+    def reset(self):
+        """Drop per-stream state (call end)."""
+        self._last_sample = 0
+        self._down_tail[:] = 0
+        self._down_phase = 0
+        for resampler in self._resamplers.values():
+            resampler.reset()
     
     @staticmethod
     def ulaw_to_pcm16(ulaw_data: bytes, sample_rate: int = 8000) -> bytes:
@@ -27,7 +244,7 @@ class AudioConverter:
         Returns:
             PCM 16-bit audio data
         """
-        return audioop.ulaw2lin(ulaw_data, 2)  # 2 bytes = 16-bit
+        return _ULAW2LIN[np.frombuffer(ulaw_data, dtype=np.uint8)].tobytes()
     
     @staticmethod
     def pcm16_to_ulaw(pcm_data: bytes) -> bytes:
@@ -40,7 +257,7 @@ class AudioConverter:
         Returns:
             μ-law encoded audio
         """
-        return audioop.lin2ulaw(pcm_data, 2)  # 2 bytes = 16-bit
+        return _LIN2ULAW[np.frombuffer(pcm_data, dtype=np.uint16)].tobytes()
     
     @staticmethod
     def resample(audio_data: bytes, from_rate: int, to_rate: int, sample_width: int = 2) -> bytes:
@@ -59,53 +276,139 @@ class AudioConverter:
         if from_rate == to_rate:
             return audio_data
         
-        return audioop.ratecv(audio_data, sample_width, 1, from_rate, to_rate, None)[0]
+        dtype = {1: np.int8, 2: np.int16, 4: np.int32}[sample_width]
+        samples = np.frombuffer(audio_data, dtype=dtype)
+        return AudioConverter.resample_ndarray(samples, from_rate, to_rate).tobytes()
     
     @staticmethod
-    def smartflo_to_gemini(ulaw_data: bytes) -> bytes:
+    def resample_ndarray(arr: np.ndarray, from_rate: int, to_rate: int) -> np.ndarray:
+        """
+        Resample a 1-D sample array (stateless).
+        
+        Args:
+            arr: Input samples
+            from_rate: Source sample rate
+            to_rate: Target sample rate
+            
+        Returns:
+            Resampled samples with arr's dtype; arr itself (no copy) when the rates match
+        """
+        if from_rate == to_rate:
+            return arr
+        
+        if soxr is not None:
+            return soxr.resample(arr, from_rate, to_rate)
+        
+        # Linear interpolation fallback
+        n_out = len(arr) * to_rate // from_rate
+        positions = np.arange(n_out) * (from_rate / to_rate)
+        resampled = np.interp(positions, np.arange(len(arr)), arr)
+        return np.rint(resampled).astype(arr.dtype)
+    
+    def smartflo_to_gemini(self, ulaw_data: bytes) -> np.ndarray:
         """
         Convert Smartflo audio (μ-law 8kHz) to Gemini format (PCM 16kHz).
         
+        Single pass: LUT decode, then 2x linear-interpolation upsample.
+        The midpoint before each sample is taken against the previous
+        sample, carried over from the last chunk for the first one.
+        
         Args:
             ulaw_data: μ-law audio from Smartflo
             
         Returns:
-            PCM 16-bit 16kHz audio for Gemini
+            PCM 16-bit 16kHz samples for Gemini, as a C-contiguous int16 array
+            (pass straight to base64). May be a view of a reusable buffer:
+            consume it before the next call.
         """
-        # Step 1: μ-law → PCM 16-bit 8kHz
-        pcm_8k = AudioConverter.ulaw_to_pcm16(ulaw_data, 8000)
+        ulaw = np.frombuffer(ulaw_data, dtype=np.uint8)
+        n = len(ulaw)
+        if not n:
+            return _EMPTY_PCM
         
-        # Step 2: Resample 8kHz → 16kHz
-        pcm_16k = AudioConverter.resample(pcm_8k, 8000, 16000, 2)
+        if numba is not None:
+            if len(self._up_buf) < 2 * n:
+                self._up_buf = np.empty(2 * n, dtype=np.int16)
+            self._last_sample = _ulaw8k_to_pcm16k(ulaw, _ULAW2LIN, self._last_sample, self._up_buf)
+            return self._up_buf[:2 * n]
         
+        samples = _ULAW2LIN[ulaw].astype(np.int32)
+        pcm_16k = np.empty(2 * len(samples), dtype=np.int16)
+        pcm_16k[0] = (self._last_sample + samples[0]) >> 1
+        pcm_16k[2::2] = (samples[:-1] + samples[1:]) >> 1
+        pcm_16k[1::2] = samples
+        
+        self._last_sample = int(samples[-1])
         return pcm_16k
     
-    @staticmethod
-    def gemini_to_smartflo(pcm_data: bytes, gemini_rate: int = 24000) -> bytes:
+    def gemini_to_smartflo(self, pcm_data: bytes, gemini_rate: int = 24000) -> bytes:
         """
-        Convert Gemini audio (PCM 24kHz) to Smartflo format (μ-law 8kHz).
+        Convert Gemini audio (PCM at its tagged rate, normally 24kHz) to
+        Smartflo format (μ-law 8kHz).
         
         Args:
-            pcm_data: PCM audio from Gemini
-            gemini_rate: Gemini's sample rate (24000 Hz)
+            pcm_data: PCM audio from Gemini (bytes or any int16 buffer)
+            gemini_rate: Sample rate of pcm_data, from its MIME type (usually 24000 Hz)
             
         Returns:
             μ-law 8kHz audio for Smartflo
         """
-        # Step 1: Resample from Gemini rate → 8kHz
-        pcm_8k = AudioConverter.resample(pcm_data, gemini_rate, 8000, 2)
+        samples = np.frombuffer(pcm_data, dtype=np.int16)
+        
+        # Step 1: Resample to 8kHz (filter state carried across chunks at every rate)
+        if gemini_rate == 8000 * _DECIM_FACTOR:
+            return self._decimate_to_ulaw(samples)
+        if gemini_rate == 8000 or not len(samples):
+            pcm_8k = samples
+        else:
+            resampler = self._resamplers.get(gemini_rate)
+            if resampler is None:
+                resampler = self._resamplers[gemini_rate] = _StreamResampler(gemini_rate)
+            pcm_8k = resampler.process(samples)
         
         # Step 2: PCM → μ-law
-        ulaw = AudioConverter.pcm16_to_ulaw(pcm_8k)
+        return _LIN2ULAW[pcm_8k.view(np.uint16)].tobytes()
+    
+    def _decimate_to_ulaw(self, samples: np.ndarray) -> bytes:
+        """
+        Polyphase decimate 24kHz PCM to 8kHz and μ-law encode.
+        
+        Only every third FIR output is computed. The last 47 input samples
+        are kept as filter history for the next chunk.
+        """
+        n = len(samples)
+        if not n:
+            return b''
+        
+        if numba is not None:
+            n_out = (n - self._down_phase + _DECIM_FACTOR - 1) // _DECIM_FACTOR
+            if len(self._down_buf) < n_out:
+                self._down_buf = np.empty(n_out, dtype=np.uint8)
+            if len(self._down_work) < n + _DECIM_NUM_TAPS - 1:
+                self._down_work = np.empty(n + _DECIM_NUM_TAPS - 1, dtype=np.float32)
+            written = _pcm24k_to_ulaw8k(
+                samples, self._down_tail, self._down_phase, _DECIM_TAPS, _LIN2ULAW,
+                self._down_work, self._down_buf
+            )
+            self._down_phase = (self._down_phase - n) % _DECIM_FACTOR
+            return self._down_buf[:written].tobytes()
+        
+        x = np.concatenate((self._down_tail, samples.astype(np.float32)))
+        windows = sliding_window_view(x, _DECIM_NUM_TAPS)[self._down_phase::_DECIM_FACTOR]
+        filtered = windows @ _DECIM_TAPS  # Taps are symmetric, no reversal needed
+        
+        self._down_tail = x[-(_DECIM_NUM_TAPS - 1):].copy()
+        self._down_phase = (self._down_phase - n) % _DECIM_FACTOR
         
-        return ulaw
+        pcm_8k = np.clip(np.rint(filtered), -32768, 32767).astype(np.int16)
+        return _LIN2ULAW[pcm_8k.view(np.uint16)].tobytes()
     
     @staticmethod
-    def to_base64(audio_data: bytes) -> str:
-        """Encode audio to base64 string."""
-        return base64.b64encode(audio_data).decode('utf-8')
+    def to_base64(audio_data: bytes) -> bytes:
+        """Encode audio to base64 (ASCII bytes; decode only where a str is required)."""
+        return b64encode(audio_data)
     
     @staticmethod
-    def from_base64(b64_string: str) -> bytes:
-        """Decode base64 string to audio bytes."""
-        return base64.b64decode(b64_string)
+    def from_base64(b64_data) -> bytes:
+        """Decode base64 str or ASCII bytes to audio bytes."""
+        return b64decode(b64_data)
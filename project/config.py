@@ -16,10 +16,19 @@ GEMINI_TEMPERATURE = 0.5  # Balanced for speed and naturalness
 GEMINI_TOP_P = 0.9
 GEMINI_MAX_TOKENS = 80   # Very short responses for minimal latency
 
+# Gemini Connection Pool - pre-connected sessions, one consumed per call
+GEMINI_POOL_SIZE = 2          # Warm sessions kept ready (0 = connect per call)
+GEMINI_POOL_MAX_IDLE_S = 300  # Discard warm sessions older than this
+GEMINI_POOL_RETRY_S = 5       # Delay before retrying a failed warm connect
+
 # Audio Configuration
 SMARTFLO_SAMPLE_RATE = 8000  # μ-law 8kHz
 GEMINI_SAMPLE_RATE = 16000   # PCM 16kHz for Gemini
 AUDIO_CHUNK_MS = 10          # 10ms chunks for ultra-low latency
+AUDIO_BATCH_CHUNKS = 2       # Inbound chunks per Gemini send (2 x 10ms = 20ms)
+AUDIO_INBOX_MAX_CHUNKS = 20  # Inbound backlog cap (200ms); oldest audio dropped beyond it
+SMARTFLO_MAX_COALESCE_FRAMES = 4  # Max queued outbound frames merged into one media message
+SMARTFLO_OUT_QUEUE_MAX_FRAMES = 100  # Outbound backlog cap; send_audio waits (backpressure) beyond it
 
 # Server Configuration
 SERVER_HOST = "0.0.0.0"
@@ -32,3 +41,4 @@ TARGET_RESPONSE_TIME_MS = 150 # Target time from user stop to bot start
 # Logging
 LOG_LEVEL = "INFO"
 ENABLE_LATENCY_LOGGING = True
+LATENCY_SAMPLE_EVERY = 10    # Measure per-message latency on every Nth Gemini message
@@ -0,0 +1,40 @@
+"""
+Fastest available base64 / JSON backends, chosen once at import and shared
+by every module (Smartflo session, Gemini client, audio converter).
+pybase64 picks its SIMD kernel (SSSE3/AVX2/AVX-512/NEON) at runtime itself;
+JSON prefers orjson, then ujson, then the stdlib.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pybase64
+    from pybase64 import b64decode, b64encode
+    BASE64_BACKEND = f"pybase64 {pybase64.get_version()}"
+except ImportError:
+    from base64 import b64decode, b64encode
+    BASE64_BACKEND = "stdlib base64"
+
+try:
+    # loads() takes str or bytes, dumps() returns bytes
+    from orjson import loads as json_loads, dumps as json_dumps, JSONDecodeError
+    JSON_BACKEND = "orjson"
+except ImportError:
+    try:
+        from ujson import loads as json_loads, dumps as json_dumps, JSONDecodeError
+        JSON_BACKEND = "ujson"
+    except ImportError:
+        from json import loads as json_loads, dumps as json_dumps, JSONDecodeError
+        JSON_BACKEND = "stdlib json"
+
+__all__ = [
+    "b64encode", "b64decode", "json_loads", "json_dumps", "JSONDecodeError",
+    "BASE64_BACKEND", "JSON_BACKEND", "log_backends",
+]
+
+
+def log_backends():
+    """Log the selected backends (call after logging is configured)."""
+    logger.info(f"⚡ base64 backend: {BASE64_BACKEND}")
+    logger.info(f"⚡ JSON backend: {JSON_BACKEND}")
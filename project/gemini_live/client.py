@@ -3,22 +3,112 @@ Gemini Live API WebSocket client.
 Handles real-time bidirectional streaming with Gemini.
 """
 import asyncio
-import json
 import logging
 import time
-from typing import Callable, Optional
+from typing import Callable, Optional, Tuple
+import msgspec
 import websockets
-from audio.converter import AudioConverter
+from gemini_live.events import event_decoder
+from fast import b64decode, b64encode, json_dumps as _dumps  # orjson dumps() returns bytes, sent as-is
 from config import (
     GEMINI_WS_URL,
     GEMINI_MODEL,
     GEMINI_TEMPERATURE,
     GEMINI_TOP_P,
-    GEMINI_MAX_TOKENS
+    GEMINI_MAX_TOKENS,
+    GEMINI_SAMPLE_RATE,
+    MAX_AUDIO_LATENCY_MS,
+    ENABLE_LATENCY_LOGGING,
+    LATENCY_SAMPLE_EVERY
 )
 
 logger = logging.getLogger(__name__)
 
+_MAX_AUDIO_LATENCY_NS = MAX_AUDIO_LATENCY_MS * 1_000_000
+
+# Keys that disqualify a frame from the audio byte-scan fast path
+_AUDIO_SCAN_REJECT = (b'"data"', b'"text"', b'"turnComplete"', b'"interrupted"')
+
+
+def _scan_audio_frame(message) -> Optional[Tuple[bytes, str]]:
+    """
+    Extract and decode the audio of an audio-only model turn by byte search.
+    
+    The base64 value never contains a quote, so only the bytes around it are
+    inspected. Anything else (text frames, control messages, text parts,
+    several parts, turn/interrupt flags) returns None and takes the full parse.
+    
+    Returns:
+        (audio bytes, MIME type) or None
+    """
+    if not isinstance(message, bytes):
+        return None
+    key = message.find(b'"data"')
+    if key < 0:
+        return None
+    start = message.find(b'"', key + 6) + 1
+    end = message.find(b'"', start)
+    if not start or end < 0:
+        return None
+    
+    if message.find(b'"modelTurn"', 0, key) < 0:
+        return None
+    mime_start = message.find(b'"audio/', 0, key)
+    if mime_start < 0:
+        mime_start = message.find(b'"audio/', end)
+        if mime_start < 0:
+            return None
+    mime_end = message.find(b'"', mime_start + 1)
+    for marker in _AUDIO_SCAN_REJECT:
+        if message.find(marker, 0, key) >= 0 or message.find(marker, end) >= 0:
+            return None
+    
+    return (
+        b64decode(memoryview(message)[start:end]),
+        message[mime_start + 1:mime_end].decode('ascii'),
+    )
+
+
+def _log_audio_latency(start_ns: int):
+    """Warn if handling a sampled message exceeded MAX_AUDIO_LATENCY_MS."""
+    latency_ns = time.monotonic_ns() - start_ns
+    if latency_ns > _MAX_AUDIO_LATENCY_NS and logger.isEnabledFor(logging.WARNING):
+        logger.warning("⚠️  Audio latency: %.0fms", latency_ns / 1_000_000)
+
+# Session setup, serialized once at import and resent as-is on every (re)connect
+_SETUP_CONFIG = {
+    "setup": {
+        "model": f"models/{GEMINI_MODEL}",
+        "generation_config": {
+            "response_modalities": ["AUDIO"],
+            "speech_config": {
+                "voice_config": {
+                    "prebuilt_voice_config": {
+                        "voice_name": "Puck"
+                    }
+                }
+            },
+            "temperature": GEMINI_TEMPERATURE,
+            "top_p": GEMINI_TOP_P,
+            "max_output_tokens": GEMINI_MAX_TOKENS
+        },
+        "system_instruction": {
+            "parts": [{
+                "text": (
+                    "You are Asha, Tata Tele assistant. Speak Hinglish. "
+                    "CRITICAL: Keep ALL responses under 10 words. Be extremely brief. "
+                    "One question at a time only. No explanations. "
+                    "First message: 'Namaste! Main Asha. Kaise madad karoon?' "
+                    "Then: Ultra-short responses like 'Ji boliye', 'Theek hai', 'Aapka number?', 'Samajh gayi'. "
+                    "Never give long answers. Speed is critical."
+                )
+            }]
+        },
+        "tools": []
+    }
+}
+_SETUP_MESSAGE = _dumps(_SETUP_CONFIG)
+
 
 class GeminiLiveClient:
     """
@@ -26,10 +116,16 @@ class GeminiLiveClient:
     Provides real-time STT → LLM → TTS streaming.
     """
     
+    __slots__ = (
+        'ws', 'connected',
+        'audio_callback', 'transcript_callback', 'vad_callback',
+        'user_speaking', 'bot_speaking',
+        '_msg_prefix', '_msg_suffix', '_b64e',
+    )
+    
     def __init__(self):
         self.ws: Optional[websockets.WebSocketClientProtocol] = None
         self.connected = False
-        self.converter = AudioConverter()
         
         # Callbacks
         self.audio_callback: Optional[Callable] = None
@@ -40,6 +136,13 @@ class GeminiLiveClient:
         self.user_speaking = False
         self.bot_speaking = False
         
+        # Precompiled realtime_input frame: prefix + base64 PCM + suffix
+        self._msg_prefix = (
+            f'{{"realtime_input":{{"media_chunks":[{{"mime_type":"audio/pcm;rate={GEMINI_SAMPLE_RATE}","data":"'
+        ).encode()
+        self._msg_suffix = b'"}]}}'
+        self._b64e = b64encode  # Bound once for the 100 fps send path
+        
     async def connect(self):
         """Establish WebSocket connection to Gemini Live API."""
         try:
@@ -47,6 +150,7 @@ class GeminiLiveClient:
             self.ws = await websockets.connect(
                 GEMINI_WS_URL,
                 max_size=10_000_000,
+                compression=None,  # base64 audio is incompressible; skip permessage-deflate
                 ping_interval=10,
                 ping_timeout=5
             )
@@ -63,47 +167,16 @@ class GeminiLiveClient:
     
     async def _send_config(self):
         """Send setup message to Gemini Live API."""
-        config = {
-            "setup": {
-                "model": f"models/{GEMINI_MODEL}",
-                "generation_config": {
-                    "response_modalities": ["AUDIO"],
-                    "speech_config": {
-                        "voice_config": {
-                            "prebuilt_voice_config": {
-                                "voice_name": "Puck"
-                            }
-                        }
-                    },
-                    "temperature": GEMINI_TEMPERATURE,
-                    "top_p": GEMINI_TOP_P,
-                    "max_output_tokens": GEMINI_MAX_TOKENS
-                },
-                "system_instruction": {
-                    "parts": [{
-                        "text": (
-                            "You are Asha, Tata Tele assistant. Speak Hinglish. "
-                            "CRITICAL: Keep ALL responses under 10 words. Be extremely brief. "
-                            "One question at a time only. No explanations. "
-                            "First message: 'Namaste! Main Asha. Kaise madad karoon?' "
-                            "Then: Ultra-short responses like 'Ji boliye', 'Theek hai', 'Aapka number?', 'Samajh gayi'. "
-                            "Never give long answers. Speed is critical."
-                        )
-                    }]
-                },
-                "tools": []
-            }
-        }
-        
-        await self.ws.send(json.dumps(config))
+        await self.ws.send(_SETUP_MESSAGE)
         logger.info("📤 Sent Gemini Live configuration (VAD enabled)")
     
-    async def send_audio_chunk(self, pcm_data: bytes):
+    async def send_audio_chunk(self, pcm_data):
         """
         Send audio chunk to Gemini immediately (no buffering).
         
         Args:
-            pcm_data: PCM 16-bit audio chunk at 16kHz
+            pcm_data: PCM 16-bit audio chunk at 16kHz (bytes or C-contiguous int16 array;
+                base64-encoded straight from its buffer, no intermediate bytes copy)
         """
         if not self.connected or not self.ws:
             return
@@ -114,23 +187,13 @@ class GeminiLiveClient:
                 self.user_speaking = True
                 logger.debug("🎤 User started speaking")
             
-            # Base64 encode
-            audio_b64 = self.converter.to_base64(pcm_data)
-            
-            # Send in realtime_input format
-            message = {
-                "realtime_input": {
-                    "media_chunks": [{
-                        "mime_type": "audio/pcm",
-                        "data": audio_b64
-                    }]
-                }
-            }
-            
-            await self.ws.send(json.dumps(message))
+            # Splice base64 audio into the realtime_input template (no dict/JSON per frame)
+            await self.ws.send(
+                self._msg_prefix + self._b64e(pcm_data) + self._msg_suffix
+            )
             
         except Exception as e:
-            logger.error(f"Error sending audio to Gemini: {e}")
+            logger.error("Error sending audio to Gemini: %s", e)
     
     async def receive_events(self):
         """
@@ -140,101 +203,95 @@ class GeminiLiveClient:
         if not self.connected or not self.ws:
             raise RuntimeError("Not connected to Gemini")
         
+        # Callbacks are wired before the receive loop starts; bind once
+        audio_callback = self.audio_callback
+        transcript_callback = self.transcript_callback
+        vad_callback = self.vad_callback
+        
+        # Latency is sampled on every Nth message only (0 = disabled)
+        sample_every = LATENCY_SAMPLE_EVERY if ENABLE_LATENCY_LOGGING else 0
+        message_count = 0
+        
+        # Await recv() directly: the connection's __aiter__ is an async generator
+        # wrapping the same call, one extra frame and asend() per message.
+        # A normal close (ConnectionClosedOK) lands in the ConnectionClosed handler.
+        recv = self.ws.recv
+        
         try:
-            async for message in self.ws:
-                start_time = time.time()
+            while True:
+                message = await recv()
+                message_count += 1
+                start_ns = time.monotonic_ns() if sample_every and message_count % sample_every == 0 else 0
                 
                 try:
-                    data = json.loads(message)
+                    # Fast path: audio-only model turn, found by byte scan (no JSON parse)
+                    scanned = _scan_audio_frame(message) if audio_callback else None
+                    if scanned and scanned[0]:
+                        if not self.bot_speaking:
+                            await self._on_bot_turn_start(vad_callback)
+                        await audio_callback(*scanned)
+                        if start_ns:
+                            _log_audio_latency(start_ns)
+                        continue
+                    
+                    event = event_decoder.decode(message)
+                    server_content = event.serverContent
                     
                     # Handle server content messages
-                    if "serverContent" in data:
-                        server_content = data["serverContent"]
+                    if server_content is not None:
+                        model_turn = server_content.modelTurn
                         
-                        # Check for model turn (includes audio output)
-                        if "modelTurn" in server_content:
-                            model_turn = server_content["modelTurn"]
-                            
-                            # Bot started speaking (VAD detected user stopped)
+                        # Model turn (includes audio output)
+                        if model_turn is not None:
                             if not self.bot_speaking:
-                                self.bot_speaking = True
-                                self.user_speaking = False
-                                logger.info("🤖 Bot speaking (VAD: user stopped)")
-                                
-                                if self.vad_callback:
-                                    await self.vad_callback("user_stopped")
-                            
-                            # Bot started speaking
-                            if not self.bot_speaking:
-                                self.bot_speaking = True
-                                logger.info("🤖 Bot started speaking")
+                                await self._on_bot_turn_start(vad_callback)
                             
                             # Handle parts (audio and text)
-                            for part in model_turn.get("parts", []):
-                                # Audio output (TTS)
-                                if "inlineData" in part:
-                                    inline_data = part["inlineData"]
-                                    mime_type = inline_data.get("mimeType", "")
-                                    
-                                    if mime_type.startswith("audio/") and self.audio_callback:
-                                        audio_b64 = inline_data.get("data", "")
-                                        if audio_b64:
-                                            # Decode and forward immediately
-                                            audio_data = self.converter.from_base64(audio_b64)
-                                            await self.audio_callback(audio_data)
-                                            
-                                            # Log latency
-                                            latency_ms = (time.time() - start_time) * 1000
-                                            if latency_ms > 50:
-                                                logger.warning(f"⚠️  Audio latency: {latency_ms:.0f}ms")
+                            for part in model_turn.parts:
+                                inline_data = part.inlineData
+                                
+                                # Audio output (TTS), already base64-decoded by msgspec
+                                if inline_data is not None:
+                                    if audio_callback and inline_data.data and inline_data.mimeType.startswith("audio/"):
+                                        await audio_callback(inline_data.data, inline_data.mimeType)
+                                        
+                                        # Log latency (sampled)
+                                        if start_ns:
+                                            _log_audio_latency(start_ns)
                                 
-                                # Text output (transcripts/responses)
-                                if "text" in part and self.transcript_callback:
-                                    text = part["text"]
-                                    if text:
-                                        await self.transcript_callback(text, partial=False)
+                                # Text output (transcripts/responses); a part may carry both
+                                if part.text and transcript_callback:
+                                    await transcript_callback(part.text, partial=False)
                         
                         # Turn complete signal (VAD: bot finished speaking)
-                        if "turnComplete" in server_content and server_content["turnComplete"]:
+                        if server_content.turnComplete:
                             self.bot_speaking = False
                             logger.info("✅ Turn complete - waiting for user")
                             
-                            if self.vad_callback:
-                                await self.vad_callback("turn_complete")
+                            if vad_callback:
+                                await vad_callback("turn_complete")
                         
-                        # Interrupted signal (user interrupted bot)
-                        if "interrupted" in server_content and server_content["interrupted"]:
+                        # Interrupted signal (user started speaking while bot was talking)
+                        if server_content.interrupted:
                             self.bot_speaking = False
                             self.user_speaking = True
                             logger.info("🔇 Bot interrupted by user")
                             
-                            if self.vad_callback:
-                                await self.vad_callback("interrupted")
-                            
-                            # Trigger VAD callback
-                            if self.vad_callback:
-                                await self.vad_callback("turn_complete")
-                        
-                        # Interrupted signal (user started speaking while bot was talking)
-                        if "interrupted" in server_content and server_content["interrupted"]:
-                            self.bot_speaking = False
-                            logger.info("🔇 Bot interrupted by user speech")
-                            
-                            if self.vad_callback:
-                                await self.vad_callback("interrupted")
+                            if vad_callback:
+                                await vad_callback("interrupted")
                     
                     # Handle setup completion
-                    if "setupComplete" in data:
+                    elif event.setupComplete is not None:
                         logger.info("✅ Gemini Live setup complete - VAD enabled")
                     
                     # Handle tool call responses (future use)
-                    if "toolCallCancellation" in data:
+                    elif event.toolCallCancellation is not None:
                         logger.debug("Tool call cancelled")
                     
-                except json.JSONDecodeError as e:
-                    logger.error(f"Invalid JSON from Gemini: {e}")
+                except msgspec.DecodeError as e:
+                    logger.error("Invalid JSON from Gemini: %s", e)
                 except Exception as e:
-                    logger.error(f"Error processing Gemini event: {e}")
+                    logger.error("Error processing Gemini event: %s", e)
         
         except websockets.exceptions.ConnectionClosed:
             logger.warning("Gemini WebSocket connection closed")
@@ -244,6 +301,15 @@ class GeminiLiveClient:
             self.connected = False
             raise
     
+    async def _on_bot_turn_start(self, vad_callback: Optional[Callable]):
+        """Bot started speaking (VAD detected user stopped)."""
+        self.bot_speaking = True
+        self.user_speaking = False
+        logger.info("🤖 Bot speaking (VAD: user stopped)")
+        
+        if vad_callback:
+            await vad_callback("user_stopped")
+    
     async def close(self):
         """Close the WebSocket connection."""
         if self.ws:
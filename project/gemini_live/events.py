@@ -0,0 +1,42 @@
+"""
+Typed Gemini Live server messages.
+Decoded with msgspec straight from the WebSocket frame: no intermediate
+dicts, and base64 audio (`bytes` fields) is decoded in C.
+"""
+from typing import List, Optional
+import msgspec
+
+
+class InlineData(msgspec.Struct):
+    """Inline media blob (TTS audio)."""
+    mimeType: str = ""
+    data: bytes = b""
+
+
+class Part(msgspec.Struct):
+    """One part of a model turn: audio or text."""
+    inlineData: Optional[InlineData] = None
+    text: Optional[str] = None
+
+
+class ModelTurn(msgspec.Struct):
+    """Model output for the current turn."""
+    parts: List[Part] = []
+
+
+class ServerContent(msgspec.Struct):
+    """Model output and turn/VAD signals."""
+    modelTurn: Optional[ModelTurn] = None
+    turnComplete: bool = False
+    interrupted: bool = False
+
+
+class GeminiEvent(msgspec.Struct):
+    """Top-level server message; fields we don't handle are ignored."""
+    serverContent: Optional[ServerContent] = None
+    setupComplete: Optional[dict] = None
+    toolCallCancellation: Optional[dict] = None
+
+
+# Shared decoder (reusable, stateless)
+event_decoder = msgspec.json.Decoder(GeminiEvent)
@@ -0,0 +1,104 @@
+"""
+Warm pool of pre-connected Gemini Live sessions.
+Takes the TLS handshake and setup round-trip off the call-answer path.
+"""
+import asyncio
+import logging
+import time
+from typing import Set
+from gemini_live.client import GeminiLiveClient
+from config import GEMINI_POOL_SIZE, GEMINI_POOL_MAX_IDLE_S, GEMINI_POOL_RETRY_S
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiPool:
+    """
+    Keeps GEMINI_POOL_SIZE Gemini Live sessions connected and configured.
+    
+    A Live session carries its conversation context, so sessions are never
+    handed to a second call: acquire() takes one out and immediately starts
+    connecting its replacement in the background, and release() discards it.
+    """
+    
+    def __init__(self, size: int = GEMINI_POOL_SIZE):
+        self.size = size
+        self._ready: asyncio.Queue = asyncio.Queue()  # (connected_at, client)
+        self._refill_tasks: Set[asyncio.Task] = set()
+        self._close_tasks: Set[asyncio.Task] = set()  # Stale sessions closing in the background
+        self._closed = False
+    
+    async def start(self):
+        """Begin connecting the initial sessions (does not wait for them)."""
+        logger.info(f"🏊 Warming Gemini pool ({self.size} sessions)...")
+        for _ in range(self.size):
+            self._spawn_refill()
+    
+    async def acquire(self) -> GeminiLiveClient:
+        """
+        Take a ready session from the pool.
+        Falls back to an unconnected client (connected by the orchestrator)
+        when the pool is empty, so a call is never held up waiting here.
+        """
+        while not self._ready.empty():
+            connected_at, client = self._ready.get_nowait()
+            self._spawn_refill()
+            
+            if self._is_usable(client) and time.monotonic() - connected_at < GEMINI_POOL_MAX_IDLE_S:
+                logger.info("🏊 Using pre-connected Gemini session")
+                return client
+            
+            # Closed by the server or idle too long: discard (close off the answer path)
+            task = asyncio.create_task(client.close())
+            self._close_tasks.add(task)
+            task.add_done_callback(self._close_tasks.discard)
+        
+        logger.warning("🏊 Gemini pool empty - connecting on demand")
+        return GeminiLiveClient()
+    
+    async def release(self, client: GeminiLiveClient):
+        """Discard a session after its call (its replacement is already connecting)."""
+        if client.connected:
+            await client.close()
+    
+    async def close(self):
+        """Stop refilling and close all idle sessions."""
+        self._closed = True
+        for task in list(self._refill_tasks):
+            task.cancel()
+        
+        while not self._ready.empty():
+            _, client = self._ready.get_nowait()
+            await client.close()
+        
+        logger.info("🏊 Gemini pool closed")
+    
+    def _spawn_refill(self):
+        """Connect one replacement session in the background."""
+        if self._closed:
+            return
+        task = asyncio.create_task(self._refill())
+        self._refill_tasks.add(task)
+        task.add_done_callback(self._refill_tasks.discard)
+    
+    async def _refill(self):
+        """Task: Connect a session and park it in the pool, retrying on failure."""
+        while not self._closed:
+            client = GeminiLiveClient()
+            try:
+                await client.connect()
+            except Exception as e:
+                logger.warning(f"🏊 Gemini pool connect failed, retrying in {GEMINI_POOL_RETRY_S}s: {e}")
+                await asyncio.sleep(GEMINI_POOL_RETRY_S)
+                continue
+            
+            if self._closed:
+                await client.close()
+            else:
+                self._ready.put_nowait((time.monotonic(), client))
+            return
+    
+    @staticmethod
+    def _is_usable(client: GeminiLiveClient) -> bool:
+        """True if the session's socket is still open."""
+        return client.connected and client.ws is not None and client.ws.open
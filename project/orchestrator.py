@@ -3,14 +3,25 @@ Real-time streaming orchestrator.
 Coordinates bidirectional audio streaming between Smartflo and Gemini Live.
 """
 import asyncio
+import concurrent.futures
 import logging
+import os
 import time
+from typing import Optional
 from smartflo.session import SmartfloAudioSession
 from gemini_live.client import GeminiLiveClient
-from audio.converter import AudioConverter
+from audio.converter import AudioConverter, parse_audio_mime
+from config import AUDIO_BATCH_CHUNKS, AUDIO_INBOX_MAX_CHUNKS, SMARTFLO_SAMPLE_RATE
 
 logger = logging.getLogger(__name__)
 
+# Audio conversion runs off the event loop on one pool shared by all calls.
+# The kernels release the GIL, so more workers than cores only adds contention;
+# per-call ordering holds because each direction awaits its own conversion.
+_CONVERT_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 2, thread_name_prefix="audio-convert"
+)
+
 
 class StreamingOrchestrator:
     """
@@ -20,18 +31,36 @@ class StreamingOrchestrator:
     Zero buffering, immediate forwarding, <300ms latency.
     """
     
-    def __init__(self, smartflo_session: SmartfloAudioSession):
+    __slots__ = (
+        'smartflo_session', 'gemini_client', 'converter',
+        '_s2g', '_g2s',
+        'running', 'tasks', '_shutdown_event', '_inbox',
+        'audio_in_count', 'audio_out_count', 'audio_dropped_count',
+        'last_user_audio_time', 'response_start_time',
+    )
+    
+    def __init__(self, smartflo_session: SmartfloAudioSession, gemini_client: Optional[GeminiLiveClient] = None):
         self.smartflo_session = smartflo_session
-        self.gemini_client = GeminiLiveClient()
+        self.gemini_client = gemini_client or GeminiLiveClient()  # May arrive pre-connected (pool)
         self.converter = AudioConverter()
         
+        # Bound converter methods for the per-chunk hot path
+        self._s2g = self.converter.smartflo_to_gemini
+        self._g2s = self.converter.gemini_to_smartflo
+        
         # State
         self.running = False
         self.tasks = []
+        self._shutdown_event = asyncio.Event()
+        
+        # Inbound μ-law chunks awaiting batching (None = flush partial batch).
+        # Bounded: if Gemini stalls, drop the oldest audio rather than grow latency.
+        self._inbox: asyncio.Queue = asyncio.Queue(maxsize=AUDIO_INBOX_MAX_CHUNKS)
         
         # Performance tracking
         self.audio_in_count = 0
         self.audio_out_count = 0
+        self.audio_dropped_count = 0
         self.last_user_audio_time = 0
         self.response_start_time = None
         
@@ -43,25 +72,27 @@ class StreamingOrchestrator:
         try:
             logger.info("🚀 Starting streaming orchestrator...")
             
-            # Connect to Gemini Live
-            await self.gemini_client.connect()
+            # Connect to Gemini Live (skipped for a pre-connected pool session)
+            if not self.gemini_client.connected:
+                await self.gemini_client.connect()
+            
+            # Caller hung up while we were connecting: stop() already ran, so close here
+            if self._shutdown_event.is_set():
+                await self.gemini_client.close()
+                return
             
             self.running = True
             
             # Set up bidirectional streaming callbacks
             self._setup_callbacks()
             
-            # Launch concurrent tasks
-            tasks = [
-                asyncio.create_task(self._forward_smartflo_to_gemini()),
-                asyncio.create_task(self._forward_gemini_to_smartflo()),
-                asyncio.create_task(self._health_check())
-            ]
-            
-            self.tasks = tasks
-            
-            # Wait for all tasks
-            await asyncio.gather(*tasks, return_exceptions=True)
+            # Launch concurrent tasks; a failure in one cancels the others at once
+            async with asyncio.TaskGroup() as tg:
+                self.tasks = [
+                    tg.create_task(self._forward_smartflo_to_gemini()),
+                    tg.create_task(self._forward_gemini_to_smartflo()),
+                    tg.create_task(self._health_check())
+                ]
             
         except Exception as e:
             logger.error(f"Error in streaming orchestrator: {e}", exc_info=True)
@@ -72,8 +103,8 @@ class StreamingOrchestrator:
         """Setup callbacks for bidirectional audio flow."""
         
         # Smartflo → Gemini
-        async def handle_smartflo_audio(ulaw_data: bytes):
-            """Process audio from Smartflo, convert, forward to Gemini immediately."""
+        def handle_smartflo_audio(ulaw_data: bytes):
+            """Queue audio from Smartflo for the batching forwarder (sync, never blocks the read loop)."""
             try:
                 # Detect if user is interrupting bot response
                 if self.response_start_time is not None:
@@ -81,65 +112,125 @@ class StreamingOrchestrator:
                     logger.info("🔇 User interrupting - stopping bot response")
                     self.response_start_time = None
                 
-                self.last_user_audio_time = time.time()
+                self.last_user_audio_time = time.monotonic()
                 self.audio_in_count += 1
                 
-                # Convert μ-law 8kHz → PCM 16kHz
-                pcm_data = self.converter.smartflo_to_gemini(ulaw_data)
-                
-                # Send to Gemini IMMEDIATELY
-                await self.gemini_client.send_audio_chunk(pcm_data)
+                # Converted and sent in 20ms batches by _forward_smartflo_to_gemini
+                self._enqueue_inbound(ulaw_data)
                 
             except Exception as e:
-                logger.error(f"Error in audio-in pipeline: {e}")
+                logger.error("Error in audio-in pipeline: %s", e)
         
         # Gemini → Smartflo
-        async def handle_gemini_audio(pcm_data: bytes):
+        async def handle_gemini_audio(pcm_data: bytes, mime_type: str = "audio/pcm;rate=24000"):
             """Process audio from Gemini, convert, forward to Smartflo immediately."""
             try:
                 # Track response latency
                 if self.response_start_time is None:
-                    response_latency = (time.time() - self.last_user_audio_time) * 1000
-                    logger.info(f"⚡ First response in {response_latency:.0f}ms")
-                    self.response_start_time = time.time()
+                    response_latency = (time.monotonic() - self.last_user_audio_time) * 1000
+                    logger.info("⚡ First response in %.0fms", response_latency)
+                    self.response_start_time = time.monotonic()
                 
                 self.audio_out_count += 1
                 
-                # Convert Gemini PCM 24kHz → μ-law 8kHz
-                ulaw_data = self.converter.gemini_to_smartflo(pcm_data, gemini_rate=24000)
+                is_ulaw, rate = parse_audio_mime(mime_type)
+                if is_ulaw and rate == SMARTFLO_SAMPLE_RATE:
+                    ulaw_data = pcm_data  # Already Smartflo's codec: skip conversion entirely
+                else:
+                    if is_ulaw:
+                        pcm_data = AudioConverter.ulaw_to_pcm16(pcm_data)
+                    
+                    # Convert Gemini PCM (24kHz) → μ-law 8kHz at its tagged rate (worker thread)
+                    ulaw_data = await asyncio.get_running_loop().run_in_executor(
+                        _CONVERT_EXECUTOR, self._g2s, pcm_data, rate
+                    )
                 
                 # Send to Smartflo IMMEDIATELY
                 await self.smartflo_session.send_audio(ulaw_data)
                 
             except Exception as e:
-                logger.error(f"Error in audio-out pipeline: {e}")
+                logger.error("Error in audio-out pipeline: %s", e)
         
         # Transcript callback (for logging/debugging)
         async def handle_transcript(text: str, partial: bool = False):
             """Handle partial/final transcripts from Gemini."""
             prefix = "[Partial]" if partial else "[Final]"
-            logger.info(f"📝 {prefix} {text}")
+            logger.info("📝 %s %s", prefix, text)
+        
+        # VAD callback (barge-in)
+        async def handle_vad(event: str):
+            """On barge-in: flush partially batched user audio, drop unsent bot audio."""
+            if event == "interrupted":
+                self._enqueue_inbound(None)
+                self.smartflo_session.clear_outgoing()
         
         # Set callbacks
         self.smartflo_session.on_audio_callback = handle_smartflo_audio
         self.gemini_client.audio_callback = handle_gemini_audio
         self.gemini_client.transcript_callback = handle_transcript
+        self.gemini_client.vad_callback = handle_vad
+    
+    def _enqueue_inbound(self, item):
+        """Queue an inbound chunk (or flush marker), dropping the oldest entry when full."""
+        try:
+            self._inbox.put_nowait(item)
+        except asyncio.QueueFull:
+            self._inbox.get_nowait()
+            self._inbox.put_nowait(item)
+            self.audio_dropped_count += 1
     
     async def _forward_smartflo_to_gemini(self):
         """
         Task: Forward audio from Smartflo to Gemini.
-        Runs continuously, zero buffering.
+        Joins AUDIO_BATCH_CHUNKS inbound chunks (20ms) into one conversion
+        and one WebSocket send; a None in the inbox flushes a partial batch.
         """
+        # Wait on the inbox *or* shutdown, so stop() always ends this task
+        shutdown_wait = asyncio.ensure_future(self._shutdown_event.wait())
+        get_task = None
         try:
             logger.info("▶️  Smartflo → Gemini audio forwarding started")
             
-            # The actual forwarding happens in the callback
-            # This task just keeps the session alive
-            while self.running and self.smartflo_session.connected:
-                await asyncio.sleep(1)
+            loop = asyncio.get_running_loop()
+            inbox = self._inbox
+            batch = []
+            while self.running:
+                if inbox.empty():
+                    get_task = asyncio.ensure_future(inbox.get())
+                    await asyncio.wait((get_task, shutdown_wait), return_when=asyncio.FIRST_COMPLETED)
+                    if not get_task.done():
+                        break
+                    ulaw_data = get_task.result()
+                    get_task = None
+                else:
+                    ulaw_data = inbox.get_nowait()
+                
+                if ulaw_data is not None:
+                    batch.append(ulaw_data)
+                    if len(batch) < AUDIO_BATCH_CHUNKS:
+                        continue
+                if not batch:
+                    continue
+                
+                try:
+                    # Convert μ-law 8kHz → PCM 16kHz (one pass for the whole batch, worker thread)
+                    pcm_data = await loop.run_in_executor(
+                        _CONVERT_EXECUTOR, self._s2g, b''.join(batch)
+                    )
+                    
+                    # Send to Gemini IMMEDIATELY
+                    await self.gemini_client.send_audio_chunk(pcm_data)
+                except Exception as e:
+                    logger.error("Error in audio-in pipeline: %s", e)
+                finally:
+                    batch.clear()
         
         except Exception as e:
             logger.error(f"Error in Smartflo→Gemini task: {e}")
+        finally:
+            shutdown_wait.cancel()
+            if get_task is not None:
+                get_task.cancel()
     
     async def _forward_gemini_to_smartflo(self):
         """
@@ -154,6 +245,13 @@ class StreamingOrchestrator:
         
         except Exception as e:
             logger.error(f"Error in Gemini→Smartflo task: {e}")
+            raise  # Tear down the TaskGroup: no point forwarding caller audio to a dead session
+        
+        # Session closed (the usual way a Live session ends): end the call too,
+        # rather than leave the caller on a silent line (no-op if already stopping)
+        if not self._shutdown_event.is_set():
+            logger.warning("Gemini session ended - stopping call")
+            await self.stop()
     
     async def _health_check(self):
         """
@@ -164,34 +262,47 @@ class StreamingOrchestrator:
             
             while self.running:
                 try:
-                    await asyncio.sleep(30)  # Check every 30 seconds to reduce overhead
-                    
-                    logger.info(
-                        f"📊 Stats: Audio IN: {self.audio_in_count}, "
-                        f"Audio OUT: {self.audio_out_count}"
-                    )
-                    
-                    # Reset response tracking for next turn
-                    if self.audio_out_count > 0:
-                        self.response_start_time = None
+                    # Check every 30 seconds to reduce overhead; wake at once on shutdown
+                    await asyncio.wait_for(self._shutdown_event.wait(), timeout=30)
+                    break
+                except asyncio.TimeoutError:
+                    pass
                 except asyncio.CancelledError:
                     break
+                
+                logger.info(
+                    f"📊 Stats: Audio IN: {self.audio_in_count}, "
+                    f"Audio OUT: {self.audio_out_count}, "
+                    f"Dropped IN: {self.audio_dropped_count}"
+                )
+                
+                # Reset response tracking for next turn
+                if self.audio_out_count > 0:
+                    self.response_start_time = None
         
         except Exception as e:
             logger.error(f"Error in health check: {e}")
     
     async def stop(self):
-        """Stop the orchestrator and cleanup."""
+        """Stop the orchestrator and cleanup (idempotent)."""
+        if self._shutdown_event.is_set():
+            return
+        
         logger.info("🛑 Stopping streaming orchestrator...")
         self.running = False
+        self._shutdown_event.set()
         
-        # Cancel all tasks
+        # Cancel all tasks (except the caller, when stop() runs from inside one)
+        current = asyncio.current_task()
         for task in self.tasks:
-            if not task.done():
+            if task is not current and not task.done():
                 task.cancel()
         
         # Close connections
         await self.gemini_client.close()
         await self.smartflo_session.close()
         
+        # No converter.reset(): a shared worker may still be inside a kernel
+        # mutating its state, and the per-call converter is discarded anyway.
+        
         logger.info("✅ Streaming orchestrator stopped")
@@ -8,8 +8,10 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
 from fastapi.responses import JSONResponse
 from smartflo.session import SmartfloAudioSession
+from fast import log_backends
+from gemini_live.pool import GeminiPool
 from orchestrator import StreamingOrchestrator
-from config import SERVER_HOST, SERVER_PORT, LOG_LEVEL
+from config import SERVER_HOST, SERVER_PORT, LOG_LEVEL, GEMINI_POOL_SIZE
 
 # Configure logging
 logging.basicConfig(
@@ -21,13 +23,21 @@ logger = logging.getLogger(__name__)
 # Active sessions
 active_sessions = {}
 
+# Pre-connected Gemini sessions (None when GEMINI_POOL_SIZE = 0)
+gemini_pool = GeminiPool() if GEMINI_POOL_SIZE > 0 else None
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events."""
     logger.info("🚀 Starting Streaming Voice Bot Server...")
+    log_backends()
+    if gemini_pool:
+        await gemini_pool.start()
     yield
     logger.info("🛑 Shutting down server...")
+    if gemini_pool:
+        await gemini_pool.close()
     # Cleanup active sessions
     for call_id, session in list(active_sessions.items()):
         try:
@@ -97,8 +107,11 @@ async def smartflo_audio_websocket(websocket: WebSocket):
         session = SmartfloAudioSession(websocket)
         await session.accept()
         
-        # Create orchestrator (will connect to Gemini)
-        orchestrator = StreamingOrchestrator(session)
+        # Take a warm Gemini session from the pool if available
+        gemini_client = await gemini_pool.acquire() if gemini_pool else None
+        
+        # Create orchestrator (connects to Gemini unless the session is pre-connected)
+        orchestrator = StreamingOrchestrator(session, gemini_client)
         
         # Start streaming in background
         stream_task = asyncio.create_task(orchestrator.start())
@@ -106,7 +119,8 @@ async def smartflo_audio_websocket(websocket: WebSocket):
         # Handle Smartflo events (blocks until connection closes)
         await session.handle_events()
         
-        # Wait for streaming to complete
+        # Caller gone: tear down the pipeline, then wait for streaming to complete
+        await orchestrator.stop()
         await stream_task
         
     except WebSocketDisconnect:
@@ -116,6 +130,8 @@ async def smartflo_audio_websocket(websocket: WebSocket):
     finally:
         if orchestrator:
             await orchestrator.stop()
+            if gemini_pool:
+                await gemini_pool.release(orchestrator.gemini_client)
         if call_id and call_id in active_sessions:
             del active_sessions[call_id]
         logger.info("=" * 80)
@@ -130,5 +146,8 @@ if __name__ == "__main__":
         app,
         host=SERVER_HOST,
         port=SERVER_PORT,
+        loop="uvloop",        # libuv event loop
+        http="httptools",     # C HTTP parser
+        ws="websockets",
         log_level=LOG_LEVEL.lower()
     )
@@ -3,36 +3,71 @@ Smartflo Audio WebSocket Session.
 Handles incoming audio from Smartflo and outgoing audio to caller.
 """
 import asyncio
-import base64
-import json
 import logging
+import re
 import time
 from typing import Callable, Optional
 from fastapi import WebSocket
-from audio.converter import AudioConverter
+# Best available base64/JSON backends; loads/dumps bound at module scope for the event loop
+from fast import (
+    b64decode, b64encode,
+    json_loads as _loads, json_dumps as _dumps, JSONDecodeError,
+)
+from config import SMARTFLO_MAX_COALESCE_FRAMES, SMARTFLO_OUT_QUEUE_MAX_FRAMES
 
 logger = logging.getLogger(__name__)
 
+# μ-law silence (0xFF) for padding frames to Smartflo's 160-byte multiple
+_SILENCE160 = b'\xff' * 160
+
+# Initial outgoing message buffer size (grown on demand for long coalesced payloads)
+_OUT_BUF_BYTES = 4096
+
+# Media fast path: (event tag, payload) patterns per frame type (text → str, binary → bytes)
+_MEDIA_PATTERNS = {
+    str: (re.compile(r'"event"\s*:\s*"media"'), re.compile(r'"payload"\s*:\s*"([^"]*)"')),
+    bytes: (re.compile(rb'"event"\s*:\s*"media"'), re.compile(rb'"payload"\s*:\s*"([^"]*)"')),
+}
+
 
 class SmartfloAudioSession:
     """
     Manages WebSocket connection with Smartflo for real-time audio streaming.
     """
     
+    # Event → handler method (media normally takes the fast path in handle_events)
+    _HANDLERS = {
+        "connected": "_handle_connected",
+        "start": "_handle_start",
+        "media": "_handle_media",
+        "stop": "_handle_stop",
+    }
+    
     def __init__(self, websocket: WebSocket):
         self.websocket = websocket
         self.connected = False
         self.stream_sid: Optional[str] = None
         self.call_sid: Optional[str] = None
         
+        # Outgoing media message template, built once the streamSid is known
+        self._stream_sid_json: Optional[str] = None
+        self._media_prefix: Optional[bytes] = None
+        self._media_suffix = b'"}}'
+        
+        # Reusable outgoing message buffer: prefix written once, payload + suffix per send
+        self._out_buf = bytearray()
+        self._out_view = memoryview(self._out_buf)
+        
+        # Outgoing μ-law frames, coalesced into fewer sends by _sender_loop.
+        # Bounded: if the Smartflo socket stalls, send_audio waits, pushing back on Gemini.
+        self._out_queue: asyncio.Queue = asyncio.Queue(maxsize=SMARTFLO_OUT_QUEUE_MAX_FRAMES)
+        self._sender_task: Optional[asyncio.Task] = None
+        
         # Callbacks
-        self.on_audio_callback: Optional[Callable] = None
+        self.on_audio_callback: Optional[Callable] = None  # Sync: must only hand off, never block
         self.on_start_callback: Optional[Callable] = None
         self.on_stop_callback: Optional[Callable] = None
         
-        # Audio converter
-        self.converter = AudioConverter()
-        
         # Statistics
         self.audio_chunks_received = 0
         self.audio_chunks_sent = 0
@@ -43,6 +78,7 @@ class SmartfloAudioSession:
         await self.websocket.accept()
         self.connected = True
         self.start_time = time.time()
+        self._sender_task = asyncio.create_task(self._sender_loop())
         logger.info("✅ Smartflo WebSocket connected")
     
     async def handle_events(self):
@@ -50,30 +86,45 @@ class SmartfloAudioSession:
         Main event loop - processes incoming Smartflo events.
         Forwards audio chunks immediately with minimal latency.
         """
+        receive = self.websocket.receive
         try:
-            async for message in self.websocket.iter_text():
+            while True:
+                frame = await receive()
+                if frame["type"] == "websocket.disconnect":
+                    break
+                
+                # Hand the raw frame payload (bytes or text) straight to orjson,
+                # no iter_text() str round-trip
+                message = frame.get("bytes") or frame.get("text")
+                if not message:
+                    continue
                 try:
-                    data = json.loads(message)
-                    event_type = data.get("event")
-                    
-                    if event_type == "connected":
-                        await self._handle_connected(data)
+                    # Fast path: media frames (nearly all traffic) are matched by tag and
+                    # the payload pulled out by regex, skipping the full JSON parse
+                    event_re, payload_re = _MEDIA_PATTERNS[type(message)]
+                    if event_re.search(message):
+                        match = payload_re.search(message)
+                        if match:
+                            payload = match.group(1)
+                            self._handle_audio_payload(
+                                payload.encode('ascii') if isinstance(payload, str) else payload
+                            )
+                            continue
                     
-                    elif event_type == "start":
-                        await self._handle_start(data)
-                    
-                    elif event_type == "media":
-                        # CRITICAL: Forward audio immediately
-                        await self._handle_media(data)
+                    data = _loads(message)
+                    event_type = data.get("event")
                     
-                    elif event_type == "stop":
-                        await self._handle_stop(data)
-                        break
+                    # Single dict lookup instead of an if/elif ladder
+                    handler = self._HANDLERS.get(event_type)
+                    if handler:
+                        await getattr(self, handler)(data)
+                        if event_type == "stop":
+                            break
                     
-                except json.JSONDecodeError as e:
-                    logger.error(f"Invalid JSON from Smartflo: {e}")
+                except JSONDecodeError as e:
+                    logger.error("Invalid JSON from Smartflo: %s", e)
                 except Exception as e:
-                    logger.error(f"Error processing Smartflo event: {e}")
+                    logger.error("Error processing Smartflo event: %s", e)
         
         except Exception as e:
             logger.error(f"Error in Smartflo event loop: {e}")
@@ -90,6 +141,14 @@ class SmartfloAudioSession:
         start_data = message.get("start", {})
         self.stream_sid = message.get("streamSid") or start_data.get("streamSid")
         self.call_sid = start_data.get("callSid")
+        if self.stream_sid:
+            # JSON-escape the streamSid once; every outgoing media message reuses it
+            stream_sid_json = _dumps(self.stream_sid)
+            if isinstance(stream_sid_json, bytes):
+                stream_sid_json = stream_sid_json.decode()
+            self._stream_sid_json = stream_sid_json
+            self._media_prefix = ('{"event":"media","streamSid":' + stream_sid_json + ',"media":{"payload":"').encode()
+            self._alloc_out_buf(_OUT_BUF_BYTES)
         
         caller_from = start_data.get("from")
         caller_to = start_data.get("to")
@@ -109,20 +168,26 @@ class SmartfloAudioSession:
         media = message.get("media", {})
         payload_b64 = media.get("payload")
         
+        if payload_b64:
+            self._handle_audio_payload(payload_b64.encode('ascii'))
+    
+    def _handle_audio_payload(self, payload_b64: bytes):
+        """Decode a base64 μ-law payload and forward it to the audio callback."""
         if not payload_b64:
             return
         
         try:
             # Decode base64 μ-law audio
-            ulaw_data = base64.b64decode(payload_b64)
+            ulaw_data = b64decode(payload_b64, validate=False)
             self.audio_chunks_received += 1
             
-            # Forward to callback IMMEDIATELY (no buffering!)
+            # Hand off to the callback without awaiting: the read loop never waits on
+            # downstream conversion or the Gemini send (queued by the orchestrator)
             if self.on_audio_callback:
-                await self.on_audio_callback(ulaw_data)
+                self.on_audio_callback(ulaw_data)
         
         except Exception as e:
-            logger.error(f"Error processing media: {e}")
+            logger.error("Error processing media: %s", e)
     
     async def _handle_stop(self, message: dict):
         """Handle 'stop' event - stream ended."""
@@ -138,41 +203,75 @@ class SmartfloAudioSession:
     
     async def send_audio(self, ulaw_data: bytes):
         """
-        Send audio chunk to Smartflo (to caller).
+        Queue audio chunk for Smartflo (to caller).
         Must be μ-law 8kHz, multiple of 160 bytes.
         
         Args:
             ulaw_data: μ-law encoded audio
         """
-        if not self.connected or not self.stream_sid:
+        if not self.connected or not self._media_prefix:
             return
         
-        try:
-            # Ensure multiple of 160 bytes (required by Smartflo)
-            if len(ulaw_data) % 160 != 0:
-                padding = 160 - (len(ulaw_data) % 160)
-                ulaw_data = ulaw_data + (b'\xff' * padding)  # Silent padding
-            
-            # Base64 encode
-            payload_b64 = base64.b64encode(ulaw_data).decode('utf-8')
+        # Ensure multiple of 160 bytes (required by Smartflo)
+        remainder = len(ulaw_data) % 160
+        if remainder:
+            ulaw_data = ulaw_data + _SILENCE160[:160 - remainder]  # Silent padding
+        
+        # Waits only when the queue is full (slow socket): never drop synthesized speech
+        await self._out_queue.put(ulaw_data)
+    
+    def clear_outgoing(self):
+        """Discard bot audio not yet sent (barge-in: stop talking over the caller)."""
+        queue = self._out_queue
+        while not queue.empty():
+            queue.get_nowait()
+    
+    async def _sender_loop(self):
+        """
+        Task: Send queued audio to Smartflo.
+        Frames that piled up while the previous send was in flight (up to
+        SMARTFLO_MAX_COALESCE_FRAMES) go out as one media message; nothing
+        waits for more audio to arrive, so no latency is added.
+        """
+        queue = self._out_queue
+        suffix = self._media_suffix
+        while True:
+            frames = [await queue.get()]
+            while len(frames) < SMARTFLO_MAX_COALESCE_FRAMES and not queue.empty():
+                frames.append(queue.get_nowait())
             
-            # Send immediately
-            message = {
-                "event": "media",
-                "streamSid": self.stream_sid,
-                "media": {
-                    "payload": payload_b64
-                }
-            }
+            ulaw_data = frames[0] if len(frames) == 1 else b''.join(frames)
+            try:
+                # Write base64 payload + suffix after the prefix already in the buffer
+                payload = b64encode(ulaw_data)
+                start = len(self._media_prefix)
+                mid = start + len(payload)
+                end = mid + len(suffix)
+                if end > len(self._out_buf):
+                    self._alloc_out_buf(end * 2)
+                out = self._out_buf
+                out[start:mid] = payload
+                out[mid:end] = suffix
+                
+                # Smartflo expects JSON text frames: one ASCII decode straight from the buffer
+                await self.websocket.send_text(str(self._out_view[:end], 'ascii'))
+                self.audio_chunks_sent += 1
             
-            await self.websocket.send_text(json.dumps(message))
-            self.audio_chunks_sent += 1
-        
-        except Exception as e:
-            logger.error(f"Error sending audio to Smartflo: {e}")
+            except Exception as e:
+                logger.error("Error sending audio to Smartflo: %s", e)
+    
+    def _alloc_out_buf(self, size: int):
+        """(Re)allocate the outgoing message buffer with the media prefix in place."""
+        self._out_view.release()
+        self._out_buf = bytearray(size)
+        self._out_buf[:len(self._media_prefix)] = self._media_prefix
+        self._out_view = memoryview(self._out_buf)
     
     async def close(self):
         """Close the WebSocket connection."""
+        if self._sender_task and not self._sender_task.done():
+            self._sender_task.cancel()
+        
         if self.connected:
             try:
                 await self.websocket.close()